@@ -151,23 +151,18 @@ class CompartmentalModel(DiseaseModel):
 
         # Determine which suceptible agents are infected during this tick
         for location in self.sim.locations:
-            # Extract the relavent sets of agents from the attendees dict
-            symptomatics_lists  = [self.sim.attendees_by_health[location][h]
-                                   for h in self.symptomatic_states]
-            asymptomatics_lists = [self.sim.attendees_by_health[location][h]
-                                   for h in self.asymptomatic_states]
-            # Take unions to get sets of symptomatic and asymptomatic agents for this location
-            symptomatics  = [sym for sym_list in symptomatics_lists for sym in sym_list]
-            asymptomatics = [asym for asym_list in asymptomatics_lists for asym in asym_list]
+            # Take unions of the relevant lists in the attendees dict to get the symptomatic and
+            # asymptomatic agents for this location, in a single pass over each
+            attendees     = self.sim.attendees_by_health[location]
+            symptomatics  = [sym for h in self.symptomatic_states for sym in attendees[h]]
+            asymptomatics = [asym for h in self.asymptomatic_states for asym in attendees[h]]
             # Check if there are any symptomatics or asymptomatics in this location
             if len(symptomatics) + len(asymptomatics) > 0:
                 # If so then calculate the probabilities to be using in the transmission calculation
                 p_sym  = self.inf_probs[location.typ]*ppm_modifier[location.typ]
                 p_asym = self.asympt_factor*self.inf_probs[location.typ]*ppm_modifier[location.typ]
                 # Determine which agents are susceptible
-                susceptible_lists = [self.sim.attendees_by_health[location][h]
-                                     for h in self.susceptible_states]
-                susceptibles = [sus for sus_list in susceptible_lists for sus in sus_list]
+                susceptibles = [sus for h in self.susceptible_states for sus in attendees[h]]
                 # Loop through susceptibles and decide if each one gets infected or not
                 for agent in susceptibles:
                     # Check if the agent has been vaccinated
@@ -2,144 +2,188 @@
 
 import os
 import os.path
+import stat
 import csv
+import atexit
+import weakref
+from array import array
+
+import numpy as np
 
 from abmlux.reporters import Reporter
 
+# Size of the write buffer for each output file.  Rows are small and written often, so a large
+# buffer keeps the number of write() calls down over long simulations.
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Handles opened by open_output and not yet closed.  Rows may sit in their buffers for a long
+# time, so any still open when the interpreter exits, e.g. because a run failed, are closed then.
+_open_outputs: weakref.WeakSet = weakref.WeakSet()
+
+@atexit.register
+def _close_open_outputs() -> None:
+    """Close every output that is still open"""
+
+    for handle in list(_open_outputs):
+        close_output(handle)
+
 # TODO: handle >1 sim at the same time using the run_id
 
-#pylint: disable=unused-argument
-#pylint: disable=attribute-defined-outside-init
-class HealthStateCounts(Reporter):
-    """Reporter that writes to a CSV file as it runs."""
+def open_output(filename: str):
+    """Open a buffered text handle for CSV output, creating its directory if needed.
 
-    def __init__(self, telemetry_bus, config):
-        super().__init__(telemetry_bus)
+    The handle is block buffered even when the filename refers to a terminal.  Reporters should
+    not flush it between rows: close_output flushes it once, when the simulation ends."""
 
-        self.filename = config['filename']
+    dirname = os.path.dirname(filename)
+    if dirname != '' and not os.path.isdir(dirname):
+        os.makedirs(dirname, exist_ok=True)
 
-        self.subscribe("resident_agents_by_health_state_counts.initial", self.initial_counts)
-        self.subscribe("resident_agents_by_health_state_counts.update", self.update_counts)
-        self.subscribe("simulation.end", self.stop_sim)
+    handle = open(filename, 'w', buffering=WRITE_BUFFER_SIZE, newline='')
+    _open_outputs.add(handle)
 
-    def initial_counts(self, resident_agents_by_health_state_counts):
-        """Called when the simulation starts.  Writes headers and creates the file handle."""
+    return handle
 
-        # Check dir exists and open handle
-        dirname = os.path.dirname(self.filename)
-        if dirname != '':
-            os.makedirs(dirname, exist_ok=True)
-        self.handle = open(self.filename, 'w')
-        self.writer = csv.writer(self.handle)
+def close_output(handle) -> None:
+    """Flush a handle opened by open_output through to disk and close it.
 
-        # Collect initial counts
-        self.health_state_counts = resident_agents_by_health_state_counts
+    Safe to call more than once, or with None for a reporter that never opened its file."""
 
-        # Write header
-        header = ["tick", "iso8601"]
-        header += list(self.health_state_counts.keys())
-        header += ["CASES"]
-        self.writer.writerow(header)
+    if handle is None or handle.closed:
+        return
 
-    def update_counts(self, clock, resident_agents_by_health_state_counts):
-        """Update the CSV, writing a single row for every clock tick"""
+    _open_outputs.discard(handle)
+    try:
+        handle.flush()
 
-        row =  [clock.t, clock.iso8601()]
-        row += list(resident_agents_by_health_state_counts.values())
-        row += [sum(list(resident_agents_by_health_state_counts.values())[1:7])]
-        self.writer.writerow(row)
+        # Devices and pipes, such as /dev/null or a redirected /dev/stdout, cannot be synced
+        fileno = handle.fileno()
+        if stat.S_ISREG(os.fstat(fileno).st_mode):
+            os.fsync(fileno)
+    finally:
+        handle.close()
 
-    def stop_sim(self):
-        """Called when the simulation ends.  Closes the file handle."""
+def row_format(columns: int) -> str:
+    """Return a format string for a CSV row with the given number of columns.
 
-        if self.handle is not None:
-            self.handle.close()
+    The output matches csv.writer's default dialect for fields that never need quoting, such as
+    numbers, dates and the clock's ISO 8601 strings.  Rows that contain free text, such as
+    configured names, must still go through csv.writer."""
 
-class ActivityCounts(Reporter):
-    """Reporter that writes to a CSV file as it runs."""
+    return ",".join(["{}"] * columns) + "\r\n"
+
+#pylint: disable=unused-argument
+#pylint: disable=attribute-defined-outside-init
+class CountsReporter(Reporter):
+    """Reporter that writes a row of agent counts to a CSV file every clock tick.
+
+    Subclasses set `topic` to the prefix of the topics on which the counts are published.  The
+    initial counts arrive as a dict, which gives the column names, and each update gives a list of
+    counts in the same order.
+
+    If `write_on_change_only` is set in the config, a row is written only when the counts differ
+    from the last row written, so ticks that are missing from the output had the same counts as
+    the row before them.  The final tick is always written, so the output can be forward-filled
+    to the end of the run."""
+
+    topic: str
 
     def __init__(self, telemetry_bus, config):
         super().__init__(telemetry_bus)
 
         self.filename = config['filename']
+        self.write_on_change_only = config['write_on_change_only'] \
+                                    if 'write_on_change_only' in config else False
+        self.last_counts = None
+        self.unwritten   = None
 
-        self.subscribe("agents_by_activity_counts.initial", self.initial_counts)
-        self.subscribe("agents_by_activity_counts.update", self.update_counts)
+        self.subscribe(f"{self.topic}.initial", self.initial_counts)
+        self.subscribe(f"{self.topic}.update", self.update_counts)
         self.subscribe("simulation.end", self.stop_sim)
 
-    def initial_counts(self, agents_by_activity_counts):
+    def header(self, counts: dict) -> list[str]:
+        """Return the header row for the initial counts given"""
+
+        return ["tick", "iso8601", *counts.keys()]
+
+    def row_values(self, counts) -> list:
+        """Return the values written after the tick and time for the counts given"""
+
+        return counts
+
+    def changed(self, counts) -> bool:
+        """Return True if the counts differ from those last written, and remember them if so"""
+
+        if counts == self.last_counts:
+            return False
+
+        # The list given is updated in place by the simulator, so keep a copy
+        self.last_counts = list(counts)
+        return True
+
+    def initial_counts(self, counts):
         """Called when the simulation starts.  Writes headers and creates the file handle."""
 
-        # Check dir exists and open handle
-        dirname = os.path.dirname(self.filename)
-        if dirname != '':
-            os.makedirs(dirname, exist_ok=True)
-        self.handle = open(self.filename, 'w')
+        self.handle = open_output(self.filename)
         self.writer = csv.writer(self.handle)
 
-        # Collect initial counts
-        self.activity_counts = agents_by_activity_counts
-
         # Write header
-        header = ["tick", "iso8601"]
-        header += list(self.activity_counts.keys())
+        header = self.header(counts)
         self.writer.writerow(header)
 
-    def update_counts(self, clock, agents_by_activity_counts):
-        """Update the CSV, writing a single row for every clock tick"""
+        # Bound once here, as rows are written every tick
+        self.write      = self.handle.write
+        self.format_row = row_format(len(header)).format
 
-        row =  [clock.t, clock.iso8601()]
-        row += list(agents_by_activity_counts.values())
-        self.writer.writerow(row)
+    def update_counts(self, clock, counts):
+        """Update the CSV, writing a single row for every clock tick.
 
-    def stop_sim(self):
-        """Called when the simulation ends.  Closes the file handle."""
+        Counts are given as a list, in the same order as the initial counts."""
 
-        if self.handle is not None:
-            self.handle.close()
+        if self.write_on_change_only:
+            if not self.changed(counts):
+                # Kept so that the final tick can be written if the counts never change again
+                self.unwritten = (clock.t, clock.iso8601())
+                return
+            self.unwritten = None
 
-class LocationTypeCounts(Reporter):
-    """Reporter that writes to a CSV file as it runs."""
+        self.write(self.format_row(clock.t, clock.iso8601(), *self.row_values(counts)))
 
-    def __init__(self, telemetry_bus, config):
-        super().__init__(telemetry_bus)
+    def stop_sim(self):
+        """Called when the simulation ends.  Writes the final tick if it was skipped, and
+        closes the file handle."""
 
-        self.filename = config['filename']
+        if self.unwritten is not None:
+            self.write(self.format_row(*self.unwritten, *self.row_values(self.last_counts)))
+            self.unwritten = None
 
-        self.subscribe("agents_by_location_type_counts.initial", self.initial_counts)
-        self.subscribe("agents_by_location_type_counts.update", self.update_counts)
-        self.subscribe("simulation.end", self.stop_sim)
+        close_output(self.handle)
 
-    def initial_counts(self, agents_by_location_type_counts):
-        """Called when the simulation starts.  Writes headers and creates the file handle."""
+class HealthStateCounts(CountsReporter):
+    """Reporter that writes resident agent counts by health state to a CSV file as it runs."""
 
-        # Check dir exists and open handle
-        dirname = os.path.dirname(self.filename)
-        if dirname != '':
-            os.makedirs(dirname, exist_ok=True)
-        self.handle = open(self.filename, 'w')
-        self.writer = csv.writer(self.handle)
+    topic = "resident_agents_by_health_state_counts"
 
-        # Collect initial counts
-        self.location_type_counts = agents_by_location_type_counts
+    def header(self, counts: dict) -> list[str]:
+        """Return the header row, with an additional column for the number of cases"""
 
-        # Write header
-        header = ["tick", "iso8601"]
-        header += list(self.location_type_counts.keys())
-        self.writer.writerow(header)
+        return super().header(counts) + ["CASES"]
 
-    def update_counts(self, clock, agents_by_location_type_counts):
-        """Update the CSV, writing a single row for every clock tick"""
+    def row_values(self, counts) -> list:
+        """Return the counts followed by the number of cases"""
 
-        row =  [clock.t, clock.iso8601()]
-        row += list(agents_by_location_type_counts.values())
-        self.writer.writerow(row)
+        # Cases are the 2nd to 7th health states
+        return [*counts, sum(counts[1:7])]
 
-    def stop_sim(self):
-        """Called when the simulation ends.  Closes the file handle."""
+class ActivityCounts(CountsReporter):
+    """Reporter that writes agent counts by activity to a CSV file as it runs."""
 
-        if self.handle is not None:
-            self.handle.close()
+    topic = "agents_by_activity_counts"
+
+class LocationTypeCounts(CountsReporter):
+    """Reporter that writes agent counts by location type to a CSV file as it runs."""
+
+    topic = "agents_by_location_type_counts"
 
 class TestingCounts(Reporter):
     """Reporter that writes to a CSV file as it runs."""
@@ -163,25 +207,22 @@ class TestingCounts(Reporter):
     def start_sim(self):
         """Called when the simulation starts.  Writes headers and creates the file handle."""
 
-        # Check dir exists and open handle
-        dirname = os.path.dirname(self.filename)
-        if dirname != '':
-            os.makedirs(dirname, exist_ok=True)
-        self.handle = open(self.filename, 'w')
+        self.handle = open_output(self.filename)
         self.writer = csv.writer(self.handle)
 
         # Write header
         header = ["tick", "iso8601", "tests performed", "tests performed (resident)",
                   "positive tests", "positive tests (resident)", "cumulative positive tests"]
         self.writer.writerow(header)
+        self.row_format = row_format(len(header))
 
     def midnight_update(self, clock):
         """Save data and reset daily counts"""
 
-        row =  [clock.t, clock.iso8601()]
-        row += [self.tests_performed, self.tests_performed_resident, self.positive_tests,
-                self.positive_tests_resident, self.cumulative_positive_tests]
-        self.writer.writerow(row)
+        self.handle.write(self.row_format.format(clock.t, clock.iso8601(), self.tests_performed,
+                                                 self.tests_performed_resident, self.positive_tests,
+                                                 self.positive_tests_resident,
+                                                 self.cumulative_positive_tests))
 
         self.tests_performed           = 0
         self.tests_performed_resident  = 0
@@ -191,20 +232,17 @@ class TestingCounts(Reporter):
     def new_test_result(self, clock, test_result, age, health, uuid, coord, resident):
         """Update the CSV, writing a single row for every clock tick"""
 
-        self.tests_performed += 1
-        if resident:
-            self.tests_performed_resident += 1
-        if test_result:
-            self.positive_tests += 1
-            self.cumulative_positive_tests += 1
-            if resident:
-                self.positive_tests_resident += 1
+        # test_result and resident are bools, so are counted by adding them
+        self.tests_performed           += 1
+        self.tests_performed_resident  += resident
+        self.positive_tests            += test_result
+        self.positive_tests_resident   += test_result and resident
+        self.cumulative_positive_tests += test_result
 
     def stop_sim(self):
         """Called when the simulation ends.  Closes the file handle."""
 
-        if self.handle is not None:
-            self.handle.close()
+        close_output(self.handle)
 
 class TestingEvents(Reporter):
     """Reporter that writes to a CSV file as it runs."""
@@ -221,11 +259,7 @@ class TestingEvents(Reporter):
     def start_sim(self):
         """Called when the simulation starts.  Writes headers and creates the file handle."""
 
-        # Check dir exists and open handle
-        dirname = os.path.dirname(self.filename)
-        if dirname != '':
-            os.makedirs(dirname, exist_ok=True)
-        self.handle = open(self.filename, 'w')
+        self.handle = open_output(self.filename)
         self.writer = csv.writer(self.handle)
 
         # Write header
@@ -236,15 +270,13 @@ class TestingEvents(Reporter):
     def new_test_result(self, clock, test_result, age, health, uuid, coord, resident):
         """Update the CSV, writing a single row for every clock tick"""
 
-        row = [clock.t, clock.iso8601(), clock.now().date(), test_result,
-               age, health, uuid, coord, resident]
-        self.writer.writerow(row)
+        self.writer.writerow([clock.t, clock.iso8601(), clock.date(),
+                              test_result, age, health, uuid, coord, resident])
 
     def stop_sim(self):
         """Called when the simulation ends.  Closes the file handle."""
 
-        if self.handle is not None:
-            self.handle.close()
+        close_output(self.handle)
 
 class QuarantineCounts(Reporter):
     """Reporter that writes to a CSV file as it runs."""
@@ -264,17 +296,17 @@ class QuarantineCounts(Reporter):
     def health_states(self, resident_agents_by_health_state_counts):
         """Called when the simulation starts.  Writes headers and creates the file handle."""
 
-        # Check dir exists and open handle
-        dirname = os.path.dirname(self.filename)
-        if dirname != '':
-            os.makedirs(dirname, exist_ok=True)
-        self.handle = open(self.filename, 'w')
+        self.handle = open_output(self.filename)
         self.writer = csv.writer(self.handle)
 
         # Write header
         header = ["tick", "date", "agents in quarantine", "average age"]
         header += list(resident_agents_by_health_state_counts.keys())
         self.writer.writerow(header)
+        self.row_format = row_format(len(header))
+
+        # Per-state counts are written in header order
+        self.health_state_keys = list(resident_agents_by_health_state_counts.keys())
 
     def update_quarantine_counts(self, clock, num_in_quaratine,
                                  agents_in_quarantine_by_health_state, total_age):
@@ -285,15 +317,14 @@ class QuarantineCounts(Reporter):
         else:
             average_age = round(total_age/num_in_quaratine, 4)
 
-        row =  [clock.t, clock.now().date()]
-        row += [num_in_quaratine, average_age] + list(agents_in_quarantine_by_health_state.values())
-        self.writer.writerow(row)
+        counts = [agents_in_quarantine_by_health_state[k] for k in self.health_state_keys]
+        self.handle.write(self.row_format.format(clock.t, clock.date(), num_in_quaratine,
+                                                 average_age, *counts))
 
     def stop_sim(self):
         """Called when the simulation ends.  Closes the file handle."""
 
-        if self.handle is not None:
-            self.handle.close()
+        close_output(self.handle)
 
 class ExposureEvents(Reporter):
     """Reporter that writes to a CSV file as it runs."""
@@ -310,10 +341,7 @@ class ExposureEvents(Reporter):
     def initial_agent_data(self, agent_uuids):
         """Called when the simulation starts.  Writes headers and creates the file handle."""
 
-        dirname = os.path.dirname(self.filename)
-        if dirname != '':
-            os.makedirs(dirname, exist_ok=True)
-        self.handle = open(self.filename, 'w')
+        self.handle = open_output(self.filename)
         self.writer = csv.writer(self.handle)
 
         # Write header
@@ -322,21 +350,28 @@ class ExposureEvents(Reporter):
                   "agent responsible", "age of agent responsible", "activity of agent responsible"]
         self.writer.writerow(header)
 
+        # There are far fewer locations than infections, so the string form of each location's
+        # coordinates is computed once and reused
+        self.coord_str = {}
+
     def new_infection(self, clock, location_typ, location_coord, agent_uuid, agent_age,
                       agent_activity, agent_responsible_uuid, agent_responsible_age,
                       agent_responsible_activity):
         """Update the CSV, writing a single row for every clock tick"""
 
-        row = [clock.t, clock.iso8601(), clock.now().date(), location_typ, location_coord,
-               agent_uuid, agent_age, agent_activity, agent_responsible_uuid, agent_responsible_age,
-               agent_responsible_activity]
-        self.writer.writerow(row)
+        coord_str = self.coord_str.get(location_coord)
+        if coord_str is None:
+            coord_str = self.coord_str[location_coord] = str(location_coord)
+
+        self.writer.writerow([clock.t, clock.iso8601(), clock.date(),
+                              location_typ, coord_str, agent_uuid,
+                              agent_age, agent_activity, agent_responsible_uuid,
+                              agent_responsible_age, agent_responsible_activity])
 
     def stop_sim(self):
         """Called when the simulation ends.  Closes the file handle."""
 
-        if self.handle is not None:
-            self.handle.close()
+        close_output(self.handle)
 
 class DeathEvents(Reporter):
     """Reporter that writes to a CSV file as it runs."""
@@ -353,10 +388,7 @@ class DeathEvents(Reporter):
     def initial_agent_data(self, agent_uuids):
         """Called when the simulation starts.  Writes headers and creates the file handle."""
 
-        dirname = os.path.dirname(self.filename)
-        if dirname != '':
-            os.makedirs(dirname, exist_ok=True)
-        self.handle = open(self.filename, 'w')
+        self.handle = open_output(self.filename)
         self.writer = csv.writer(self.handle)
 
         # Write header
@@ -367,15 +399,13 @@ class DeathEvents(Reporter):
     def new_death(self, clock, agent_uuid, agent_age, home_loc_type, work_loc_type):
         """Update the CSV, writing a single row for every clock tick"""
 
-        row = [clock.t, clock.iso8601(), clock.now().date(), agent_uuid, agent_age,
-               home_loc_type, work_loc_type]
-        self.writer.writerow(row)
+        self.writer.writerow([clock.t, clock.iso8601(), clock.date(),
+                              agent_uuid, agent_age, home_loc_type, work_loc_type])
 
     def stop_sim(self):
         """Called when the simulation ends.  Closes the file handle."""
 
-        if self.handle is not None:
-            self.handle.close()
+        close_output(self.handle)
 
 class SecondaryInfectionCounts(Reporter):
     """Reporter that writes to a CSV file as it runs."""
@@ -389,45 +419,41 @@ class SecondaryInfectionCounts(Reporter):
         self.subscribe("new_infection", self.new_infection)
         self.subscribe("simulation.end", self.stop_sim)
 
-        self.secondary_infections_by_agent = {}
+        self.agent_index          = {}
+        self.secondary_infections = array('I')
 
     def initial_agent_data(self, agent_uuids):
-        """Initialize secondary infection counts"""
+        """Initialize secondary infection counts.
+
+        Counts are held in a flat array, indexed by each agent's position in agent_uuids."""
 
-        for agent_uuid in agent_uuids:
-            self.secondary_infections_by_agent[agent_uuid] = 0
+        self.agent_index          = {agent_uuid: i for i, agent_uuid in enumerate(agent_uuids)}
+        self.secondary_infections = array('I', [0]) * len(agent_uuids)
 
     def new_infection(self, clock, location_typ, location_coord, agent_uuid, agent_age,
                       agent_activity, agent_responsible_uuid, agent_responsible_age,
                       agent_responsible_activity):
         """Update the secondary infection counts"""
 
-        self.secondary_infections_by_agent[agent_responsible_uuid] += 1
+        self.secondary_infections[self.agent_index[agent_responsible_uuid]] += 1
 
     def stop_sim(self):
         """Called when the simulation ends.  Closes the file handle."""
 
-        dirname = os.path.dirname(self.filename)
-        if dirname != '':
-            os.makedirs(dirname, exist_ok=True)
-        self.handle = open(self.filename, 'w')
+        self.handle = open_output(self.filename)
         self.writer = csv.writer(self.handle)
 
         # Write header
         header = ["secondary_infections", "count"]
         self.writer.writerow(header)
 
-        max_secondary_infections = max(list(self.secondary_infections_by_agent.values()))
-        secondary_infection_counts = {num : 0 for num in range(0, max_secondary_infections + 1)}
-        for agent_uuid in self.secondary_infections_by_agent:
-            secondary_infection_counts[self.secondary_infections_by_agent[agent_uuid]] += 1
-
-        for count in secondary_infection_counts:
-            row = [count, secondary_infection_counts[count]]
-            self.writer.writerow(row)
+        # Number of agents responsible for each number of secondary infections, written as
+        # (secondary_infections, count) rows
+        secondary_infection_counts = np.bincount(np.frombuffer(self.secondary_infections,
+                                                               dtype=np.uintc))
+        self.writer.writerows(enumerate(secondary_infection_counts.tolist()))
 
-        if self.handle is not None:
-            self.handle.close()
+        close_output(self.handle)
 
 class ContactCounts(Reporter):
     """Reporter that writes to a CSV file as it runs."""
@@ -444,23 +470,24 @@ class ContactCounts(Reporter):
     def start_sim(self):
         """Initialize contact counts"""
 
-        dirname = os.path.dirname(self.filename)
-        if dirname != '':
-            os.makedirs(dirname, exist_ok=True)
-        self.handle = open(self.filename, 'w')
+        self.handle = open_output(self.filename)
         self.writer = csv.writer(self.handle)
 
         # Write header
         header = ["tick", "date", "average total contacts", "average regular contacts"]
         self.writer.writerow(header)
+        self.row_format = row_format(len(header))
 
     def contact_data(self, clock, regular_contact_counts, total_contact_counts):
         """Update the contact counts"""
 
         def average_contacts(counts):
             """Calculate average counts"""
-            total_weight   = sum(counts.values())
-            total_contacts = sum([k*counts[k] for k in counts])
+            total_weight   = 0
+            total_contacts = 0
+            for num_contacts, weight in counts.items():
+                total_weight   += weight
+                total_contacts += num_contacts * weight
             if total_weight == 0:
                 average = "N/A"
             else:
@@ -470,14 +497,13 @@ class ContactCounts(Reporter):
         average_total_contacts   = average_contacts(total_contact_counts)
         average_regular_contacts = average_contacts(regular_contact_counts)
 
-        row = [clock.t, clock.now().date(), average_total_contacts, average_regular_contacts]
-        self.writer.writerow(row)
+        self.handle.write(self.row_format.format(clock.t, clock.date(),
+                                                 average_total_contacts, average_regular_contacts))
 
     def stop_sim(self):
         """Called when the simulation ends.  Closes the file handle."""
 
-        if self.handle is not None:
-            self.handle.close()
+        close_output(self.handle)
 
 class VaccinationEvents(Reporter):
     """Reporter that writes to a CSV file as it runs."""
@@ -494,10 +520,7 @@ class VaccinationEvents(Reporter):
     def initial_agent_data(self, agent_uuids):
         """Called when the simulation starts.  Writes headers and creates the file handle."""
 
-        dirname = os.path.dirname(self.filename)
-        if dirname != '':
-            os.makedirs(dirname, exist_ok=True)
-        self.handle = open(self.filename, 'w')
+        self.handle = open_output(self.filename)
         self.writer = csv.writer(self.handle)
 
         # Write header
@@ -507,11 +530,10 @@ class VaccinationEvents(Reporter):
     def first_doses(self, clock, agent_data):
         """Update the CSV, writing a single row for every clock tick"""
 
-        for row in agent_data:
-            self.writer.writerow([clock.t, clock.now().date()] + row)
+        t, date = clock.t, clock.date()
+        self.writer.writerows([t, date, *row] for row in agent_data)
 
     def stop_sim(self):
         """Called when the simulation ends.  Closes the file handle."""
 
-        if self.handle is not None:
-            self.handle.close()
+        close_output(self.handle)
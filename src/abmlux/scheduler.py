@@ -2,6 +2,7 @@
 
 import logging
 from collections import defaultdict
+from functools import partial
 from typing import Callable
 
 from abmlux.sim_time import SimClock
@@ -20,8 +21,10 @@ class Scheduler:
     def tick(self, t: int) -> None:
         """Check to see if we should en/disable any interventions at this time"""
 
-        if t in self.actions and self.actions[t] is not None:
-            for action in self.actions[t]:
+        # Actions fall on only a few ticks, so look them up once and skip the rest
+        actions = self.actions.get(t)
+        if actions:
+            for action in actions:
                 log.debug("Scheduled action at t=%i: %s", t, action)
                 action()
 
@@ -68,7 +71,6 @@ class Scheduler:
         # This will keep things indexed by tick as a space-time tradeoff
 #        actions = [None] * (events[-1][0] + 1)
         actions: defaultdict[int, list[Callable]] = defaultdict(list)
-        action_factory = lambda i, vn, vv: lambda: i.set_registered_variable(vn, vv)
         for tick, intervention, event in events:
             list_of_actions = actions[tick] or []
             if event == 'disable':
@@ -79,8 +81,8 @@ class Scheduler:
             # Set a variable to a value
             elif isinstance(event, dict):
                 for variable_name, new_value in event.items():
-                    new_action = action_factory(intervention, variable_name, new_value)
-                    list_of_actions.append(new_action)
+                    list_of_actions.append(partial(intervention.set_registered_variable,
+                                                   variable_name, new_value))
             actions[tick] = list_of_actions
 
         return actions
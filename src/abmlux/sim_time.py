@@ -4,7 +4,7 @@ Used to represent time in the model."""
 
 import logging
 from collections import defaultdict
-from datetime import datetime,timedelta
+from datetime import date,datetime,timedelta
 from typing import Union
 
 from dateutil.parser import parse
@@ -18,6 +18,16 @@ class SimClock:
     # They're appropriate in this case.
     # pylint: disable=too-many-instance-attributes
 
+    # now(), date() and iso8601() are requested many times per tick, e.g. by every reporter, so
+    # the last value of each is kept along with the tick it was computed for.  The defaults are
+    # set here as well as in __init__ so that clocks pickled before the caches existed still work.
+    _now_t     = None
+    _now       = None
+    _date_t    = None
+    _date      = None
+    _iso8601_t = None
+    _iso8601   = None
+
     def __init__(self, tick_length_s: int, simulation_length_days: int=100,
                  epoch: Union[datetime, str]=datetime.now()):
         """Create a new clock.
@@ -50,11 +60,12 @@ class SimClock:
             self.epoch = epoch
 
         self.tick_length_s = tick_length_s
-        self.ticks_in_second = 1          / self.tick_length_s
-        self.ticks_in_minute = 60         / self.tick_length_s
-        self.ticks_in_hour   = 3600       / self.tick_length_s
-        self.ticks_in_day    = 86400      / self.tick_length_s
-        self.ticks_in_week   = int(604800 / self.tick_length_s)
+        self.tick_length   = timedelta(seconds=tick_length_s)
+        self.ticks_in_second = self._ticks_in(1)
+        self.ticks_in_minute = self._ticks_in(60)
+        self.ticks_in_hour   = self._ticks_in(3600)
+        self.ticks_in_day    = self._ticks_in(86400)
+        self.ticks_in_week   = self._ticks_in(604800)
 
         self.epoch_week_offset = int(self.epoch.weekday() * self.ticks_in_day \
                                  + self.epoch.hour        * self.ticks_in_hour \
@@ -62,18 +73,51 @@ class SimClock:
                                  + self.epoch.second      * self.ticks_in_second)
         self.max_ticks         = int(self.days_to_ticks(simulation_length_days))
 
+        # Per-tick caches for now(), date() and iso8601()
+        self._now_t     = None
+        self._now       = None
+        self._date_t    = None
+        self._date      = None
+        self._iso8601_t = None
+        self._iso8601   = None
+
         self.t       = 0
-        self.started = False
+        self._next_t = 0
         self.reset()
 
         log.info("New clock created at %s, tick_length=%i, simulation_days=%i, week_offset=%i",
                  self.epoch, tick_length_s, simulation_length_days, self.epoch_week_offset)
 
+    def __setstate__(self, state: dict) -> None:
+        """Restore a pickled clock, filling in attributes added since it was pickled"""
+
+        self.__dict__.update(state)
+
+        if 'tick_length' not in state:
+            self.tick_length = timedelta(seconds=self.tick_length_s)
+
+        # Older clocks stored a started flag instead of the next tick to return
+        if '_next_t' not in state:
+            started      = self.__dict__.pop('started', False)
+            self._next_t = self.t + 1 if started else 0
+
+    def _ticks_in(self, seconds: int) -> Union[int, float]:
+        """Return the number of ticks in a period, as an int if it is a whole number of ticks"""
+
+        if seconds % self.tick_length_s == 0:
+            return seconds // self.tick_length_s
+        return seconds / self.tick_length_s
+
     def reset(self) -> None:
         """Reset the clock to the start once more"""
         log.debug("Resetting clock at t=%i", self.t)
         self.t       = 0
-        self.started = False
+        self._next_t = 0
+
+    @property
+    def started(self) -> bool:
+        """True once the clock has ticked for the first time since it was last reset"""
+        return self._next_t > 0
 
     def __iter__(self):
         self.reset()
@@ -81,15 +125,14 @@ class SimClock:
 
     def __next__(self):
 
-        if self.started:
-            self.t += 1
-        else:
-            self.started = True
-
-        if self.t >= self.max_ticks:
+        # The tick to return is kept separately from t, so that t reads 0 before the clock has
+        # started without a special case for the first tick
+        t = self.t = self._next_t
+        if t >= self.max_ticks:
             raise StopIteration()
 
-        return self.t
+        self._next_t = t + 1
+        return t
 
     def __len__(self):
         return self.max_ticks
@@ -100,18 +143,34 @@ class SimClock:
 
     def now(self) -> datetime:
         """Return a datetime.datetime showing the clock time"""
-        # TODO: speed this up by doing dead reckonining
-        #        instead of using the date libs
-        return self.epoch + self.time_elapsed()
+        if self._now_t != self.t:
+            # The clock normally moves forward one tick at a time, so step on from the last value
+            if self._now_t == self.t - 1:
+                self._now = self._now + self.tick_length
+            else:
+                self._now = self.epoch + self.time_elapsed()
+            self._now_t = self.t
+        return self._now
+
+    def date(self) -> date:
+        """Return a datetime.date showing the clock's date"""
+
+        if self._date_t != self.t:
+            self._date   = self.now().date()
+            self._date_t = self.t
+        return self._date
 
     def iso8601(self) -> str:
         """Return ISO 8601 time as a string"""
 
-        return self.now().strftime('%m/%d/%YT%H:%M:%S %Z')
+        if self._iso8601_t != self.t:
+            self._iso8601   = self.now().strftime('%m/%d/%YT%H:%M:%S %Z')
+            self._iso8601_t = self.t
+        return self._iso8601
 
     def ticks_through_week(self) -> int:
         """Returns the number of whole ticks through the week this is"""
-        return int((self.epoch_week_offset + self.t) % self.ticks_in_week)
+        return (self.epoch_week_offset + self.t) % self.ticks_in_week
 
     def ticks_elapsed(self) -> int:
         """Return the number of ticks elapsed since the start of the simulation.
@@ -216,8 +275,14 @@ class DeferredEventPool:
         This is used to decide which deferred events to launch, and should generally not need
         to be called by the user if the messagebus is handling time events."""
 
-        for event in self.events[t]:
-            topic, args, kwargs = event
+        # Most ticks have no events due, so avoid creating and deleting an empty list for them
+        events = self.events.get(t)
+        if events is None:
+            return
+
+        # Events added for this tick by the callbacks below are appended to this list, and so
+        # are fired in the same loop
+        for topic, args, kwargs in events:
             if isinstance(topic, str):
                 self.bus.publish(topic, *args, **kwargs)
             else:
@@ -167,6 +167,16 @@ class Simulator:
         self.telemetry_bus.publish("resident_agents_by_health_state_counts.initial",
             self.resident_agents_by_health_state_counts)
 
+        # From here on the counts are kept as lists in the same order as the initial dicts, so
+        # that updating them is a list index rather than a dict lookup.  Activities are already
+        # ints that index into this order.
+        self.location_type_index = {lt: i for i, lt in enumerate(self.location_types)}
+        self.health_state_index  = {hs: i for i, hs in enumerate(self.health_states)}
+        self.agents_by_location_type_counts = list(self.agents_by_location_type_counts.values())
+        self.agents_by_activity_counts      = list(self.agents_by_activity_counts.values())
+        self.resident_agents_by_health_state_counts = \
+            list(self.resident_agents_by_health_state_counts.values())
+
         # Start the main loop
         update_notifications = []
         for t in self.clock:
@@ -201,10 +211,12 @@ class Simulator:
 
         for agent, updates in self.agent_updates.items():
 
-            self.agents_by_location_type_counts[agent.current_location.typ] -= 1
-            self.agents_by_activity_counts[self.activity_manager.as_str(agent.current_activity)]-= 1
+            self.agents_by_location_type_counts[
+                self.location_type_index[agent.current_location.typ]] -= 1
+            self.agents_by_activity_counts[agent.current_activity] -= 1
             if agent.nationality == self.region:
-                self.resident_agents_by_health_state_counts[agent.health] -= 1
+                self.resident_agents_by_health_state_counts[
+                    self.health_state_index[agent.health]] -= 1
 
             self.attendees_by_health[agent.current_location][agent.health].remove(agent)
             self.attendees_by_activity[agent.current_location][agent.current_activity].remove(agent)
@@ -231,14 +243,20 @@ class Simulator:
 
             # ---------------------------------------------------------------------------------
 
-            self.agents_by_location_type_counts[agent.current_location.typ] += 1
-            self.agents_by_activity_counts[self.activity_manager.as_str(agent.current_activity)]+= 1
+            self.agents_by_location_type_counts[
+                self.location_type_index[agent.current_location.typ]] += 1
+            self.agents_by_activity_counts[agent.current_activity] += 1
             if agent.nationality == self.region:
-                self.resident_agents_by_health_state_counts[agent.health] += 1
+                self.resident_agents_by_health_state_counts[
+                    self.health_state_index[agent.health]] += 1
 
             self.attendees_by_health[agent.current_location][agent.health].append(agent)
             self.attendees_by_activity[agent.current_location][agent.current_activity].append(agent)
 
+        # Unlike the .initial topics, which carry dicts keyed by location type, activity and
+        # health state, the .update topics carry lists of counts in the same order as the keys
+        # of the corresponding .initial dict.  Subscribers take the names from the .initial dict.
+        # The lists are updated in place, so subscribers must copy them to keep values.
         self.telemetry_bus.publish("agents_by_location_type_counts.update", self.clock,
                                    self.agents_by_location_type_counts)
         self.telemetry_bus.publish("agents_by_activity_counts.update", self.clock,
@@ -0,0 +1,165 @@
+"""Tests the CSV reporters"""
+
+import csv
+import io
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from abmlux.config import Config
+from abmlux.messagebus import MessageBus
+from abmlux.reporters.csv import open_output, close_output, row_format, \
+                                 SecondaryInfectionCounts, HealthStateCounts, QuarantineCounts
+from abmlux.sim_time import SimClock
+
+
+def test_row_format_matches_csv_writer():
+    """Formatted rows are identical to those written by csv.writer"""
+
+    row = [12, "03/01/2020T02:00:00 ", date(2020, 3, 1), 0.1234, "N/A", 7]
+
+    handle = io.StringIO()
+    csv.writer(handle).writerow(row)
+
+    assert row_format(len(row)).format(*row) == handle.getvalue()
+
+
+def test_close_output(tmp_path):
+    """Closing an output writes its buffered rows, and closing again does nothing"""
+
+    filename = tmp_path / "out" / "rows.csv"
+    handle   = open_output(str(filename))
+    handle.write("1,2\r\n")
+
+    close_output(handle)
+    close_output(handle)
+    close_output(None)
+
+    assert handle.closed
+    assert filename.read_bytes() == b"1,2\r\n"
+
+
+def test_close_output_device():
+    """Outputs that are not regular files are closed without being synced"""
+
+    handle = open_output(os.devnull)
+    handle.write("1,2\r\n")
+
+    close_output(handle)
+
+    assert handle.closed
+
+
+def test_secondary_infection_counts(tmp_path):
+    """The histogram of secondary infections covers every agent"""
+
+    filename = tmp_path / "secondary_infections.csv"
+    bus      = MessageBus()
+    SecondaryInfectionCounts(bus, Config(_dict={'filename': str(filename)}))
+
+    bus.publish("agent_data.initial", ["a", "b", "c", "d"])
+    for responsible in ["b", "b", "d", "b"]:
+        bus.publish("new_infection", None, "House", (0, 0), "x", 30, "Home",
+                    responsible, 40, "Work")
+    bus.publish("simulation.end")
+
+    with open(filename, newline='') as fin:
+        rows = list(csv.reader(fin))
+
+    assert rows == [["secondary_infections", "count"],
+                    ["0", "2"], ["1", "1"], ["2", "0"], ["3", "1"]]
+
+
+def test_quarantine_counts_single_health_state(tmp_path):
+    """Quarantine counts are written when only one health state is reported"""
+
+    filename = tmp_path / "quarantine.csv"
+    bus      = MessageBus()
+    QuarantineCounts(bus, Config(_dict={'filename': str(filename)}))
+    clock    = SimClock(3600, simulation_length_days=1, epoch="1st March 2020")
+
+    bus.publish("resident_agents_by_health_state_counts.initial", {"SUSCEPTIBLE": 10})
+    bus.publish("quarantine_data", clock, 2, {"SUSCEPTIBLE": 2}, 60)
+    bus.publish("simulation.end")
+
+    with open(filename, newline='') as fin:
+        rows = list(csv.reader(fin))
+
+    assert rows == [["tick", "date", "agents in quarantine", "average age", "SUSCEPTIBLE"],
+                    ["0", str(clock.date()), "2", "30.0", "2"]]
+
+
+class TestHealthStateCounts(unittest.TestCase):
+    """Tests the rows written by the HealthStateCounts reporter"""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+
+        self.filename = os.path.join(tmpdir.name, "health_state_counts.csv")
+        self.bus      = MessageBus()
+        self.clock    = SimClock(3600, simulation_length_days=1, epoch="1st March 2020")
+
+    def write_rows(self, initial_counts, counts_at, **config):
+        """Run the reporter for a day, publishing counts_at(t) every tick, and return its rows"""
+
+        HealthStateCounts(self.bus, Config(_dict={'filename': self.filename, **config}))
+
+        self.bus.publish("resident_agents_by_health_state_counts.initial", initial_counts)
+        for t in self.clock:
+            self.bus.publish("resident_agents_by_health_state_counts.update", self.clock,
+                             counts_at(t))
+        self.bus.publish("simulation.end")
+
+        with open(self.filename, newline='') as fin:
+            return list(csv.reader(fin))
+
+    def iso8601(self, hour):
+        """Return the clock's ISO 8601 string for the given hour of the first day"""
+
+        return self.clock.epoch.replace(hour=hour).strftime('%m/%d/%YT%H:%M:%S %Z')
+
+    def test_health_state_counts(self):
+        """A row of counts is written for every tick, with the number of cases"""
+
+        states = ["S", "E", "A", "P", "I", "H", "C", "R", "D"]
+        rows   = self.write_rows({s: 0 for s in states}, lambda t: list(range(t, t + 9)))
+
+        assert rows[0] == ["tick", "iso8601", *states, "CASES"]
+        assert len(rows) == 25
+        assert rows[3] == ["2", self.iso8601(2),
+                           *[str(c) for c in range(2, 11)], str(sum(range(3, 9)))]
+
+    def test_counts_write_on_change_only(self):
+        """Rows are only written for ticks where the counts have changed"""
+
+        counts = [5, 0, 0, 0, 0, 0, 0, 0, 0]
+
+        def counts_at(t):
+            # Updated in place, as the simulator does
+            if t in (4, 10):
+                counts[0] -= 1
+                counts[1] += 1
+            return counts
+
+        rows = self.write_rows(dict(enumerate(counts)), counts_at, write_on_change_only=True)
+
+        assert [row[0] for row in rows[1:]] == ["0", "4", "10", "23"]
+        assert rows[-2][2:4] == ["3", "2"]
+
+    def test_counts_write_on_change_only_final_tick(self):
+        """The final tick is written even when its counts have not changed"""
+
+        counts = [5, 0, 0, 0, 0, 0, 0, 0, 0]
+
+        def counts_at(t):
+            if t == 4:
+                counts[0] -= 1
+                counts[1] += 1
+            return counts
+
+        rows = self.write_rows(dict(enumerate(counts)), counts_at, write_on_change_only=True)
+
+        assert [row[0] for row in rows[1:]] == ["0", "4", "23"]
+        assert rows[-1] == ["23", self.iso8601(23), "4", "1", *["0"] * 7, "1"]
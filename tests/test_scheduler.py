@@ -0,0 +1,38 @@
+"""Tests the intervention scheduler"""
+
+from abmlux.config import Config
+from abmlux.interventions import Intervention
+from abmlux.scheduler import Scheduler
+from abmlux.sim_time import SimClock
+
+
+class SchedulableIntervention(Intervention):
+    """Intervention with a variable that can be set on a schedule"""
+
+    def __init__(self):
+        super().__init__(Config(_dict={}), False)
+
+        self.strength = 0
+        self.register_variable('strength')
+
+
+def test_scheduled_actions():
+    """Actions happen at the tick they are scheduled for, and at no other"""
+
+    clock        = SimClock(3600, simulation_length_days=2, epoch="1st March 2020")
+    intervention = SchedulableIntervention()
+    scheduler    = Scheduler(clock, {intervention: {"1st March 2020 05:00:00": "enable",
+                                                    7: {"strength": 3},
+                                                    30: "disable"}})
+
+    history = []
+    for t in clock:
+        scheduler.tick(t)
+        history.append((intervention.enabled, intervention.strength))
+
+    assert history[4]  == (False, 0)
+    assert history[5]  == (True, 0)
+    assert history[7]  == (True, 3)
+    assert history[29] == (True, 3)
+    assert history[30] == (False, 3)
+    assert set(scheduler.actions) == {5, 7, 30}
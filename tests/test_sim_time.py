@@ -1,10 +1,12 @@
 """Tests the clock"""
 
+import pickle
 from datetime import timedelta,datetime
 
 import pytest
 
 import abmlux.sim_time as st
+from abmlux.messagebus import MessageBus
 
 
 SECONDS_IN_A_MINUTE = 60
@@ -93,6 +95,32 @@ class TestSimClock:
 
             now += timedelta(seconds=tick_length)
 
+    def test_now_follows_ticks(self):
+        """Tests that the time reported is correct as the clock ticks and is reset"""
+
+        epoch = datetime(year=2020, month=1, day=1)
+        clock = st.SimClock(600, simulation_length_days=1, epoch=epoch)
+
+        for t in clock:
+            expected = epoch + timedelta(seconds=t * 600)
+            assert clock.now() == expected
+            assert clock.date() == expected.date()
+            assert clock.iso8601() == expected.strftime('%m/%d/%YT%H:%M:%S %Z')
+
+        clock.reset()
+        assert clock.now() == epoch
+        assert clock.iso8601() == epoch.strftime('%m/%d/%YT%H:%M:%S %Z')
+
+    def test_now_with_skipped_ticks(self):
+        """Tests that the time reported is correct when it is not asked for every tick"""
+
+        epoch = datetime(year=2020, month=1, day=1)
+        clock = st.SimClock(600, simulation_length_days=1, epoch=epoch)
+
+        for t in clock:
+            if t % 7 in (0, 1):
+                assert clock.now() == epoch + timedelta(seconds=t * 600)
+
     def test_tick_length_check(self):
         """Tests tick length"""
 
@@ -131,3 +159,76 @@ class TestSimClock:
         t = next(clock)
         assert t == 1
         assert clock.started
+
+    def test_unpickle_older_clock(self):
+        """Tests that a clock pickled before the per-tick caches were added still works"""
+
+        epoch = datetime(year=2020, month=1, day=1)
+        clock = _older_clock(st.SimClock(600, simulation_length_days=1, epoch=epoch))
+
+        clock.reset()
+        assert clock.now() == epoch
+        assert clock.date() == epoch.date()
+        assert clock.iso8601() == epoch.strftime('%m/%d/%YT%H:%M:%S %Z')
+
+        for t in clock:
+            assert clock.now() == epoch + timedelta(seconds=t * 600)
+
+    def test_unpickle_older_started_clock(self):
+        """Tests that a clock pickled mid-run by an older version resumes where it left off"""
+
+        clock = st.SimClock(600, simulation_length_days=1)
+        for _ in range(3):
+            next(clock)
+
+        clock = _older_clock(clock, started=True)
+        assert clock.started
+        assert 'started' not in clock.__dict__
+        assert next(clock) == 3
+
+        clock = _older_clock(st.SimClock(600, simulation_length_days=1))
+        assert not clock.started
+        assert next(clock) == 0
+
+
+# Attributes added to SimClock since the clocks in existing state files were pickled
+NEW_CLOCK_ATTRIBUTES = ['_now_t', '_now', '_date_t', '_date', '_iso8601_t', '_iso8601',
+                        'tick_length', '_next_t']
+
+def _older_clock(clock, started=False):
+    """Round-trip a clock through pickle as it would have been stored by older versions"""
+
+    older = object.__new__(st.SimClock)
+    older.__dict__.update({k: v for k, v in clock.__dict__.items()
+                           if k not in NEW_CLOCK_ATTRIBUTES})
+    older.__dict__['started'] = started
+
+    return pickle.loads(pickle.dumps(older))
+
+
+class TestDeferredEventPool:
+    """Tests the deferred event pool"""
+
+    def test_events_fire_at_deadline(self):
+        """Events fire on the tick they are due, including those added by other events"""
+
+        bus   = MessageBus()
+        clock = st.SimClock(3600, simulation_length_days=1)
+        pool  = st.DeferredEventPool(bus, clock)
+
+        fired = []
+        bus.subscribe("test.event", lambda name: fired.append((clock.t, name)), self)
+
+        def chain(name):
+            fired.append((clock.t, name))
+            pool.add("test.event", 0, "same tick")
+
+        pool.add("test.event", 3, "first")
+        pool.add(chain, 5, "chain")
+        pool.add("test.event", timedelta(hours=5), "second")
+
+        for t in clock:
+            bus.publish("notify.time.tick", clock, t)
+
+        assert fired == [(3, "first"), (5, "chain"), (5, "second"), (5, "same tick")]
+        assert len(pool.events) == 0